@@ -123,34 +123,70 @@ class QTCVTexture(CVOpenGLTexture):
     def updateCVTexture(self, cvTextureRef):
         libQuickTime.QTVisualContextCopyImageForTime(self.visualContext, None, None, byref(cvTextureRef))
 
-class QTGWorldTexture(OpenGLTexture):
-    target = gl.GL_TEXTURE_2D
-    #target = glext.GL_TEXTURE_RECTANGLE_ARB
-    texture_id = 0
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
-    def __init__(self, gworldContext):
+def glGetInteger(pname):
+    value = gl.GLint(0)
+    gl.glGetIntegerv(pname, byref(value))
+    return value.value
+
+_glExtensions = None
+def glHasExtension(name):
+    global _glExtensions
+    if _glExtensions is None:
+        _glExtensions = set((gl.glGetString(gl.GL_EXTENSIONS) or '').split())
+    return name in _glExtensions
+
+def tileSpans(length, maxSize, powerOf2=False, minTile=64):
+    """Splits length into (offset, span, texSpan) runs no larger than maxSize.
+
+    With powerOf2, spans follow the binary decomposition of length so only the
+    last run, smaller than minTile, is padded up to a power of two.
+    """
+    result = []
+    offset = 0
+    while offset < length:
+        remaining = length - offset
+        if remaining >= maxSize:
+            span = maxSize
+        elif not powerOf2:
+            span = remaining
+        else:
+            span = Texture.nextPowerOf2(remaining)
+            if span > remaining:
+                span >>= 1
+            if span < minTile:
+                span = remaining
+
+        if powerOf2:
+            texSpan = Texture.nextPowerOf2(span)
+        else: texSpan = span
+        result.append((offset, span, texSpan))
+        offset += span
+    return result
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class QTGWorldTextureTile(OpenGLTexture):
+    """One texture covering the pixels of rect = (x, y, w, h) in a GWorld, y down from the top"""
+
+    def __init__(self, target, data, rect, texSize):
         OpenGLTexture.__init__(self)
-        self._data_ptr = gworldContext.data.ctypes._as_parameter_
-        self.size = gworldContext.size
+        x, y, w, h = rect
+        self.target = target
+        self.rect = rect
+        self.size = (w, h)
+        self.texSize = texSize
 
-        self.target = Texture.validTargets(['rect', '2d']).next()
+        self.texCoords[:] = self.size
         if self.target == gl.GL_TEXTURE_2D:
-            self.texSize = tuple(map(Texture.nextPowerOf2, self.size))
-            self.texCoords[:] = self.size
             self.texCoords /= self.texSize
-        else:
-            self.texCoords[:] = self.size
-            self.texSize = self.size
         self.texCoords *= [[0,1], [1,1], [1,0], [0,0]]
 
+        # strided view into the GWorld buffer; uploads read it in place using GL_UNPACK_ROW_LENGTH
+        self._data = data[y:y+h, x:x+w]
         self.initTexture()
 
-    def __del__(self):
-        self.destroy()
-
-    def destroy(self):
-        pass
-
     def initTexture(self):
         texture_id = gl.GLenum(0)
         gl.glGenTextures(1, byref(texture_id))
@@ -165,19 +201,143 @@ class QTGWorldTexture(OpenGLTexture):
 
         gl.glTexParameteri(self.target, gl.GL_TEXTURE_MAG_FILTER, gl.GL_LINEAR)
         gl.glTexParameteri(self.target, gl.GL_TEXTURE_MIN_FILTER, gl.GL_LINEAR)
+        # keep linear filtering from blending a tile's edge with its opposite edge
+        gl.glTexParameteri(self.target, gl.GL_TEXTURE_WRAP_S, gl.GL_CLAMP_TO_EDGE)
+        gl.glTexParameteri(self.target, gl.GL_TEXTURE_WRAP_T, gl.GL_CLAMP_TO_EDGE)
 
         dataFormat = gl.GL_RGBA
         dataType = gl.GL_UNSIGNED_INT_8_8_8_8
         gl.glTexImage2D(self.target, 0, gl.GL_RGBA8, 
             self.texSize[0], self.texSize[1], False, 
             dataFormat, dataType, None)
-        self._pushToTexture = partial(gl.glTexSubImage2D, self.target, 0, 
-                0, 0, self.size[0], self.size[1], 
-                dataFormat, dataType, self._data_ptr)
 
-    _pushToTexture = None
+        w, h = self.size
+        pushes = [(0, 0, self._data)]
+        # replicate the last column and row into the padding, which linear
+        # filtering samples one texel into at the tile's right and bottom edges
+        if self.texSize[0] > w:
+            pushes.append((w, 0, self._data[:, w-1:w]))
+        if self.texSize[1] > h:
+            pushes.append((0, h, self._data[h-1:h, :]))
+        if self.texSize[0] > w and self.texSize[1] > h:
+            pushes.append((w, h, self._data[h-1:h, w-1:w]))
+
+        self._pushesToTexture = [
+                partial(gl.glTexSubImage2D, self.target, 0, 
+                    x, y, data.shape[1], data.shape[0], 
+                    dataFormat, dataType, data.ctypes._as_parameter_)
+                for x, y, data in pushes]
+
+    _pushesToTexture = ()
     def update(self, force=False):
         self.bind()
-        self._pushToTexture()
+        for pushToTexture in self._pushesToTexture:
+            pushToTexture()
+        return True
+
+class QTGWorldTexture(OpenGLTexture):
+    """Texture for a QTGWorldContext, allocated without power of two padding when possible.
+
+    Rectangle or non power of two textures are sized to the movie exactly.
+    When only power of two textures are available, or the movie exceeds the
+    maximum texture size, the frame is split into tiles.  A single tile is
+    exposed directly through texture_id, texSize and texCoords.  A tiled
+    texture has no single texture to select, and raises if used that way;
+    draw() renders every tile, or iterTiles() selects each in turn.
+    draw() works for both.
+    """
+
+    target = gl.GL_TEXTURE_2D
+    #target = glext.GL_TEXTURE_RECTANGLE_ARB
+    texture_id = 0
+    minTileSize = 64
+
+    def __init__(self, gworldContext):
+        OpenGLTexture.__init__(self)
+        self.size = gworldContext.size
+
+        self.target = Texture.validTargets(['rect', '2d']).next()
+        self.tiles = self.allocateTiles(gworldContext.data)
+
+        if not self.isTiled():
+            tile = self.tiles[0]
+            self.texture_id = tile.texture_id
+            self.texSize = tile.texSize
+            self.texCoords = tile.texCoords
+        else:
+            self.texSize = None
+            self.texCoords = None
+
+    def __del__(self):
+        self.destroy()
+
+    def destroy(self):
+        pass
+
+    def isTiled(self):
+        return len(self.tiles) > 1
+
+    def allocateTiles(self, data):
+        if self.target == gl.GL_TEXTURE_2D:
+            maxSize = glGetInteger(gl.GL_MAX_TEXTURE_SIZE)
+            powerOf2 = not glHasExtension('GL_ARB_texture_non_power_of_two')
+        else:
+            maxSize = glGetInteger(glext.GL_MAX_RECTANGLE_TEXTURE_SIZE_ARB)
+            powerOf2 = False
+
+        tiles = []
+        for y, h, texH in tileSpans(self.size[1], maxSize, powerOf2, self.minTileSize):
+            for x, w, texW in tileSpans(self.size[0], maxSize, powerOf2, self.minTileSize):
+                tiles.append(QTGWorldTextureTile(self.target, data, (x, y, w, h), (texW, texH)))
+        return tiles
+
+    def _checkUntiled(self):
+        if self.isTiled():
+            raise RuntimeError("Movie texture is split into %d tiles; use draw() or iterTiles()" % (len(self.tiles),))
+
+    def bind(self):
+        self._checkUntiled()
+        gl.glBindTexture(self.target, self.texture_id)
+    def enable(self):
+        self._checkUntiled()
+        gl.glEnable(self.target)
+
+    def iterTiles(self):
+        """Selects each tile in turn, yielding it while bound and enabled"""
+        for tile in self.tiles:
+            tile.select()
+            try:
+                yield tile
+            finally:
+                tile.deselect()
+
+    def draw(self, pos=(0, 0), size=None):
+        """Draws the whole frame as textured quads, y up, with its lower left corner at pos"""
+        if size is None:
+            size = self.size
+        sx = float(size[0]) / self.size[0]
+        sy = float(size[1]) / self.size[1]
+
+        for tile in self.iterTiles():
+            x, y, w, h = tile.rect
+            # tile rects run y down from the top of the frame
+            x0 = pos[0] + x*sx; x1 = x0 + w*sx
+            y1 = pos[1] + (self.size[1] - y)*sy; y0 = y1 - h*sy
+
+            # texCoords are ordered lower left, lower right, upper right, upper left
+            tc = tile.texCoords
+            gl.glBegin(gl.GL_QUADS)
+            gl.glTexCoord2f(tc[0,0], tc[0,1]); gl.glVertex2f(x0, y0)
+            gl.glTexCoord2f(tc[1,0], tc[1,1]); gl.glVertex2f(x1, y0)
+            gl.glTexCoord2f(tc[2,0], tc[2,1]); gl.glVertex2f(x1, y1)
+            gl.glTexCoord2f(tc[3,0], tc[3,1]); gl.glVertex2f(x0, y1)
+            gl.glEnd()
+
+    def update(self, force=False):
+        gl.glPixelStorei(gl.GL_UNPACK_ROW_LENGTH, self.size[0])
+        # reversed so the first tile, which backs an untiled texture_id, is left bound
+        for tile in reversed(self.tiles):
+            tile.update(force)
+        gl.glPixelStorei(gl.GL_UNPACK_ROW_LENGTH, 0)
         return True
 
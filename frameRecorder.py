@@ -0,0 +1,307 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import os
+import sys
+import time
+import weakref
+import threading
+import Queue
+
+from struct import pack
+
+import numpy
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Constants / Variiables / Etc.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# one record per frame slot, so record i describes frame i
+frameIndexDType = numpy.dtype([
+    ('time', '<i8'),        # movie time value
+    ('timeScale', '<i4'),   # movie time scale
+    ('wallclock', '<f8'),   # time.time() when the frame was captured
+    ('offset', '<i8'),      # byte offset of the frame's pixels in the output
+    ])
+
+frameMarker = 'FRAME\n'
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class MovieFrameRecorder(object):
+    """Records a movie's decoded GWorld frames to a preallocated memory-mapped file.
+
+    Frames are copied into a pooled buffer from the movie's drawing complete
+    callback and handed to a background writer thread through a bounded queue.
+    When every buffer is in flight, dropPolicy decides what happens:
+
+        'block'         wait up to blockTimeout for the writer (backpressure)
+        'dropNewest'    discard the frame just drawn
+        'dropOldest'    discard the oldest frame still waiting to be written
+
+    The 'y4m' container writes a YUV4MPEG2-style header, tagging the GWorld's
+    byte order as XCOLORSPACE (e.g. ABGR), and a FRAME marker before each frame;
+    'raw' writes pixels only.  Every frame occupies the same number of bytes, and
+    the sidecar index at path + '.idx' holds one frameIndexDType record per frame,
+    so frame i and its timestamps are both found in O(1).
+
+    The output files are created by start() and trimmed to the frames written
+    by stop(); a recorder records once.  Once maxFrames frames are queued,
+    further draws are counted in framesSkipped without being copied.
+    """
+
+    dropPolicies = ('block', 'dropNewest', 'dropOldest')
+    containers = ('y4m', 'raw')
+
+    blockTimeout = None
+    framesCaptured = 0
+    framesWritten = 0
+    framesDropped = 0   # discarded by dropPolicy
+    framesSkipped = 0   # not captured because the output is full
+
+    _writer = None
+    _framesQueued = 0
+    _closed = False
+
+    def __init__(self, movie, path, maxFrames, queueSize=4, dropPolicy='block', container='y4m', frameRate=30.0):
+        if dropPolicy not in self.dropPolicies:
+            raise ValueError("Unknown drop policy: %r" % (dropPolicy,))
+        if container not in self.containers:
+            raise ValueError("Unknown container: %r" % (container,))
+
+        data = getattr(movie.displayContext, 'data', None)
+        if data is None or not data.size:
+            raise RuntimeError("Frame recording requires a movie with a GWorld display context")
+
+        self.movie = movie
+        self.path = path
+        self.maxFrames = maxFrames
+        self.dropPolicy = dropPolicy
+        self.container = container
+        self.frameRate = frameRate
+        self.frameShape = data.shape
+        self.pixelFormat = pack('!I', movie.displayContext.pixelFormat)
+
+        self._free = Queue.Queue()
+        for i in xrange(queueSize):
+            self._free.put(numpy.empty(data.shape, data.dtype))
+        self._pending = Queue.Queue(queueSize)
+        self._lock = threading.Lock()
+
+    def __del__(self):
+        try:
+            self.stop()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def getHeader(self):
+        if self.container != 'y4m':
+            return ''
+        h, w = self.frameShape[:2]
+        return 'YUV4MPEG2 W%d H%d F%d:1000 Ip A1:1 XCOLORSPACE=%s\n' % (
+                w, h, int(round(self.frameRate*1000)), self.pixelFormat)
+
+    def getFrameMarker(self):
+        if self.container != 'y4m':
+            return ''
+        return frameMarker
+
+    def createOutput(self):
+        header = self.getHeader()
+        marker = self.getFrameMarker()
+        frameBytes = int(numpy.prod(self.frameShape))
+
+        self.headerSize = len(header)
+        self.frameStride = len(marker) + frameBytes
+        self.dataOffset = len(marker)
+
+        self._output = numpy.memmap(self.path, 'B', 'w+',
+                shape=(self.headerSize + self.maxFrames*self.frameStride,))
+        self._output[:self.headerSize] = numpy.fromstring(header, 'B')
+        self._frames = self._output[self.headerSize:].reshape(self.maxFrames, self.frameStride)
+        if marker:
+            self._frames[:, :len(marker)] = numpy.fromstring(marker, 'B')
+
+        self._index = numpy.memmap(self.path + '.idx', frameIndexDType, 'w+', shape=(self.maxFrames,))
+
+    def closeOutput(self):
+        count = self.framesWritten
+        self._output.flush()
+        self._index.flush()
+        del self._frames, self._output, self._index
+
+        # trim the unused preallocation so the file sizes give the frame count
+        for path, size in [
+                (self.path, self.headerSize + count*self.frameStride),
+                (self.path + '.idx', count*frameIndexDType.itemsize)]:
+            f = open(path, 'r+b')
+            try: f.truncate(size)
+            finally: f.close()
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def start(self):
+        if self._writer is not None:
+            return False
+        if self._closed:
+            raise RuntimeError("Recording to %r is already closed" % (self.path,))
+
+        self.createOutput()
+        self._writer = threading.Thread(target=self._writeLoop, name='MovieFrameRecorder')
+        self._writer.setDaemon(True)
+        self._writer.start()
+
+        wrSelf = weakref.ref(self)
+        def onDrawingComplete(movie):
+            recorder = wrSelf()
+            if recorder is not None:
+                recorder.captureFrame()
+        self.movie.setDrawingComplete(onDrawingComplete)
+        return True
+
+    def stop(self):
+        if self._writer is None:
+            return False
+
+        self.movie.setDrawingComplete(None)
+        self._pending.put(None)
+        self._writer.join()
+        self._writer = None
+
+        self.closeOutput()
+        self._closed = True
+        return True
+
+    def isRecording(self):
+        return self._writer is not None
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def _acquireBuffer(self):
+        if self.dropPolicy == 'block':
+            try:
+                return self._free.get(True, self.blockTimeout)
+            except Queue.Empty:
+                return None
+
+        try:
+            return self._free.get_nowait()
+        except Queue.Empty:
+            if self.dropPolicy == 'dropNewest':
+                return None
+
+        # dropOldest: reclaim the oldest frame the writer has not reached yet
+        try:
+            item = self._pending.get_nowait()
+        except Queue.Empty:
+            item = None
+        if item is None:
+            # the writer is busy with every buffer; wait for one to come back
+            return self._free.get()
+
+        self._countDropped()
+        self._framesQueued -= 1
+        return item[0]
+
+    def _countDropped(self):
+        with self._lock:
+            self.framesDropped += 1
+
+    def captureFrame(self):
+        """Queues the movie's current frame; returns False if it was dropped"""
+        if self._writer is None:
+            return False
+        if self._framesQueued >= self.maxFrames:
+            # every slot in the output is spoken for; skip the copy entirely
+            self.framesSkipped += 1
+            return False
+
+        buf = self._acquireBuffer()
+        if buf is None:
+            self._countDropped()
+            return False
+
+        buf[...] = self.movie.displayContext.data
+        self.framesCaptured += 1
+        self._framesQueued += 1
+        self._pending.put((buf, self.movie.getTime(), self.movie.getTimeScale(), time.time()))
+        return True
+
+    def _writeLoop(self):
+        while 1:
+            item = self._pending.get()
+            if item is None:
+                break
+
+            buf, movieTime, timeScale, wallclock = item
+            try:
+                # captureFrame never queues more frames than the output holds
+                idx = self.framesWritten
+                self._frames[idx, self.dataOffset:] = buf.reshape(-1)
+                self._index[idx] = (movieTime, timeScale, wallclock,
+                        self.headerSize + idx*self.frameStride + self.dataOffset)
+                self.framesWritten = idx + 1
+            finally:
+                self._free.put(buf)
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class MovieFrameReader(object):
+    """Random access to frames written by MovieFrameRecorder.
+
+    The frame shape is read from a y4m header; raw output needs frameShape.
+    """
+
+    pixelFormat = None
+
+    def __init__(self, path, frameShape=None):
+        if frameShape is None:
+            frameShape = self.readHeader(path)
+        self.frameShape = tuple(frameShape)
+        self._frameBytes = int(numpy.prod(self.frameShape))
+
+        if os.path.getsize(path + '.idx'):
+            self.index = numpy.memmap(path + '.idx', frameIndexDType, 'r')
+            self.data = numpy.memmap(path, 'B', 'r')
+        else:
+            # nothing was recorded; numpy cannot map an empty file
+            self.index = numpy.zeros(0, frameIndexDType)
+            self.data = numpy.zeros(0, 'B')
+
+    def readHeader(self, path):
+        f = open(path, 'rb')
+        try: header = f.readline()
+        finally: f.close()
+
+        tags = header.split()
+        if not tags or tags[0] != 'YUV4MPEG2':
+            raise ValueError("%r has no y4m header; frameShape is required for raw output" % (path,))
+
+        tags = dict((tag[0], tag[1:]) for tag in tags[1:])
+        self.pixelFormat = tags.get('X', 'XCOLORSPACE=ABGR').split('=', 1)[-1]
+        return (int(tags['H']), int(tags['W']), len(self.pixelFormat))
+
+    def __len__(self):
+        return len(self.index)
+
+    def getFrame(self, idx):
+        offset = self.index[idx]['offset']
+        return self.data[offset:offset+self._frameBytes].reshape(self.frameShape)
+    __getitem__ = getFrame
+
+    def getTime(self, idx):
+        record = self.index[idx]
+        return record['time'] / float(record['timeScale'])
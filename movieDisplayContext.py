@@ -123,6 +123,8 @@ class QTGWorldContext(QTMovieDisplayContext):
     #k32ARGBPixelFormat = 0x00000020
     k32RGBAPixelFormat = 0x41424752
     k32ABGRPixelFormat = 0x52474241
+    # 0x41424752 is the 'ABGR' four char code: bytes in data are ordered A, B, G, R
+    pixelFormat = k32RGBAPixelFormat
     TextureFactory = QTGWorldTexture
 
     @classmethod
@@ -163,7 +165,7 @@ class QTGWorldContext(QTMovieDisplayContext):
 
         errqt = libQuickTime.NewGWorldFromPtr(
                 byref(self._as_parameter_), 
-                self.k32RGBAPixelFormat,
+                self.pixelFormat,
                 byref(rect),
                 None,
                 None,
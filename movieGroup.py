@@ -0,0 +1,210 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import sys
+
+from ctypes import byref, c_void_p
+
+from .quickTimeMovie import libQuickTime, TimeRecord
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Libraries
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+libQuickTime.NewTimeBase.restype = c_void_p
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class MovieGroup(object):
+    """Slaves a set of QTMovie instances to one master time base.
+
+    Each member's time base follows the group's master, so rate changes and
+    seeks applied to the group reach every member together and no per-movie
+    setTime() correction is needed to keep them in lockstep.
+    """
+
+    _as_parameter_ = None
+    timeScale = 600
+    playRate = 1.0
+    looping = 0
+
+    def __init__(self, movies=()):
+        self.members = []
+        self._memberStates = {}
+        for movie in movies:
+            self.add(movie)
+
+    def __del__(self):
+        try:
+            self.destroy()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+
+    def destroy(self):
+        for movie in self.members[:]:
+            self.remove(movie)
+        self.destroyTimeBase()
+
+    def createTimeBase(self, masterClock):
+        if self._as_parameter_:
+            return self
+
+        self._as_parameter_ = c_void_p(libQuickTime.NewTimeBase())
+        if not self._as_parameter_:
+            raise RuntimeError("NewTimeBase failed with error code: %r" % (libQuickTime.GetMoviesError(),))
+
+        libQuickTime.SetTimeBaseMasterClock(self, masterClock, None)
+        libQuickTime.SetTimeBaseRate(self, 0)
+        libQuickTime.SetTimeBaseValue(self, 0, self.timeScale)
+        return self
+
+    def destroyTimeBase(self):
+        if not self._as_parameter_: return
+        libQuickTime.DisposeTimeBase(self)
+        self._as_parameter_ = None
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def add(self, movie):
+        if movie in self.members:
+            return False
+
+        if movie.getMasterTimeBase():
+            raise ValueError("Movie is already slaved to another time base: %r" % (movie,))
+
+        # remember the movie's own clock and looping so they can be restored on removal
+        masterClock = movie.getMasterClock()
+        if not masterClock:
+            raise ValueError("Movie has no master clock: %r" % (movie,))
+        timeBaseFlags = libQuickTime.GetTimeBaseFlags(movie.getTimeBase())
+
+        self.createTimeBase(masterClock)
+        self._memberStates[id(movie)] = (masterClock, timeBaseFlags)
+
+        movie.setMasterTimeBase(self)
+        # members run at unit rate relative to the master; the group rate lives on the master
+        movie.setRate(1.0)
+        self.members.append(movie)
+
+        self.updateExtent()
+        self.setLooping(self.looping)
+        return True
+
+    def remove(self, movie):
+        if movie not in self.members:
+            return False
+
+        self.members.remove(movie)
+        masterClock, timeBaseFlags = self._memberStates.pop(id(movie))
+        movie.setMasterClock(masterClock)
+        movie.pause()
+
+        libQuickTime.SetTimeBaseFlags(movie.getTimeBase(), timeBaseFlags)
+        # QuickTime has no getter for play hints; QTMovie.setLooping keeps hintsLoop with loopTimeBase
+        hintsLoop = 0x2
+        movie.setPlayHints((timeBaseFlags & 0x1) and hintsLoop, hintsLoop)
+
+        self.updateExtent()
+        return True
+
+    def __len__(self):
+        return len(self.members)
+    def __iter__(self):
+        return iter(self.members)
+    def __contains__(self, movie):
+        return movie in self.members
+
+    def getDuration(self):
+        """Duration of the longest member, in seconds"""
+        durations = [m.getDuration()/float(m.getTimeScale()) for m in self.members]
+        return max(durations or [0.0])
+
+    def updateExtent(self):
+        if not self._as_parameter_: return
+
+        timeRecord = TimeRecord(0, self.timeScale, None)
+        libQuickTime.SetTimeBaseStartTime(self, byref(timeRecord))
+        timeRecord.value = int(self.getDuration() * self.timeScale)
+        libQuickTime.SetTimeBaseStopTime(self, byref(timeRecord))
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def setLooping(self, looping=1):
+        """Loops the group over the longest member's duration.
+
+        Only the master loops; a shorter member holds at its end until the
+        master wraps, so every member restarts together.
+        """
+        self.looping = looping
+        if not self._as_parameter_: return
+        libQuickTime.SetTimeBaseFlags(self, looping) # loopTimeBase
+
+        hintsLoop = 0x2
+        for movie in self.members:
+            # clear any loopTimeBase left by QTMovie.setLooping so members do not wrap on their own
+            libQuickTime.SetTimeBaseFlags(movie.getTimeBase(), 0)
+            movie.setPlayHints(looping and hintsLoop, hintsLoop)
+
+    def getRate(self):
+        r = libQuickTime.GetTimeBaseRate(self)
+        return r / 65536.0
+    def setRate(self, rate):
+        return libQuickTime.SetTimeBaseRate(self, int(rate * 65536))
+
+    def getTime(self):
+        """Current master time, in seconds"""
+        t = libQuickTime.GetTimeBaseTime(self, self.timeScale, None)
+        return t / float(self.timeScale)
+    def setTime(self, seconds):
+        libQuickTime.SetTimeBaseValue(self, int(seconds * self.timeScale), self.timeScale)
+
+    def start(self, rate=None):
+        if rate is not None:
+            self.playRate = rate
+
+        rate = int(self.playRate * 65536)
+        for movie in self.members:
+            libQuickTime.PrerollMovie(movie, movie.getTime(), rate)
+        self.setRate(self.playRate)
+    def stop(self):
+        self.setRate(0)
+    def pause(self):
+        self.setRate(0)
+    def goToBeginning(self):
+        self.setTime(0)
+
+    def isPlaying(self):
+        return self.getRate() != 0
+
+    def process(self, seconds=0):
+        for movie in self.members:
+            movie.process(seconds)
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def getDrift(self, movie):
+        """Seconds the member is ahead (positive) or behind (negative) of the master"""
+        # the master wraps at the group duration; members clamp at their own end
+        memberDuration = movie.getDuration()/float(movie.getTimeScale())
+        masterTime = min(self.getTime(), memberDuration)
+
+        memberTime = movie.getTime()/float(movie.getTimeScale())
+        return memberTime - masterTime
+
+    def getDrifts(self):
+        return [(movie, self.getDrift(movie)) for movie in self.members]
+
+    def getMaxDrift(self):
+        drifts = [abs(drift) for movie, drift in self.getDrifts()]
+        return max(drifts or [0.0])
@@ -0,0 +1,247 @@
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+##~ Copyright (C) 2002-2007  TechGame Networks, LLC.              ##
+##~                                                               ##
+##~ This library is free software; you can redistribute it        ##
+##~ and/or modify it under the terms of the BSD style License as  ##
+##~ found in the LICENSE file included with this distribution.    ##
+##~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~##
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Imports
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+import time
+from timeit import default_timer
+from collections import deque
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Constants / Variiables / Etc.
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+hintsScrubMode = 0x1
+hintsHighQuality = 0x100
+hintsSingleField = 0x100000
+
+# shed levels, in the order load is taken off a movie
+levelFull = 0
+levelLowResolution = 1  # drop high quality and decode a single field
+levelSkipUpload = 2     # stop pushing frames to the texture
+levelShortTask = 3      # shrink the MoviesTask slice
+levelKeyframes = 4      # scrub mode; decoder favors key frames
+levelNames = ['full', 'lowResolution', 'skipUpload', 'shortTask', 'keyframes']
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class GovernedMovie(object):
+    level = levelFull
+
+    def __init__(self, movie, priority=1.0, visible=True, taskSlice=0, highQuality=False):
+        self.movie = movie
+        self.priority = priority
+        self.visible = visible
+        self.taskSlice = taskSlice
+        # when set, the governor owns the high quality hint: on at full, off once degraded
+        self.highQuality = highQuality
+        if highQuality:
+            movie.setPlayHints(hintsHighQuality, hintsHighQuality)
+
+    def getWeight(self):
+        # off-screen movies carry no weight, so they are always shed first
+        if not self.visible:
+            return 0.0
+        return self.priority
+
+    def isLevelEffective(self, level):
+        """False for levels that shed nothing more than the level below them"""
+        if level == levelSkipUpload:
+            return self.visible
+        if level == levelShortTask:
+            return self.taskSlice > 0
+        return True
+
+    def nextLevel(self):
+        for level in xrange(self.level+1, levelKeyframes+1):
+            if self.isLevelEffective(level):
+                return level
+        return None
+    def prevLevel(self):
+        for level in xrange(self.level-1, levelFull-1, -1):
+            if self.isLevelEffective(level):
+                return level
+        return None
+
+    def degradeCost(self):
+        return self.getWeight() * (self.nextLevel() + 1)
+    def restoreCost(self):
+        return self.getWeight() * self.level
+
+    def hintsForLevel(self, level):
+        flags = 0
+        if self.highQuality and level < levelLowResolution:
+            flags |= hintsHighQuality
+        if level >= levelLowResolution:
+            flags |= hintsSingleField
+        if level >= levelKeyframes:
+            flags |= hintsScrubMode
+        return flags
+
+    def setLevel(self, level):
+        oldFlags = self.hintsForLevel(self.level)
+        flags = self.hintsForLevel(level)
+        self.level = level
+
+        # only touch the hints this change of level affects
+        flagsMask = oldFlags ^ flags
+        if flagsMask:
+            self.movie.setPlayHints(flags & flagsMask, flagsMask)
+
+    def isUploading(self):
+        return self.visible and self.level < levelSkipUpload
+
+    def getTaskSlice(self):
+        if self.level >= levelShortTask:
+            return 0
+        return self.taskSlice
+
+    def process(self):
+        movie = self.movie
+        movie.process(self.getTaskSlice())
+        if self.isUploading():
+            qtTexture = movie.qtTexture
+            if qtTexture is not None:
+                qtTexture.update()
+
+class MovieQualityGovernor(object):
+    """Holds a set of movies to a target frame rate by shedding load by priority.
+
+    process() services every movie and times the work spent in QTMovie.process()
+    and the texture update().  When the smoothed frame time stays over budget for
+    degradeFrames ticks, the movie with the lowest weighted cost drops one shed
+    level; when it stays under restoreThreshold of the budget for restoreFrames
+    ticks, the most valuable degraded movie climbs back one level.
+    """
+
+    targetFrameRate = 30.0
+    degradeThreshold = 1.0
+    restoreThreshold = 0.7
+    degradeFrames = 5
+    restoreFrames = 30
+    smoothing = 0.2
+    logSize = 256
+
+    avgFrameTime = None
+
+    def __init__(self, targetFrameRate=None):
+        if targetFrameRate is not None:
+            self.targetFrameRate = targetFrameRate
+        self.members = []
+        self.log = deque(maxlen=self.logSize)
+        self._overBudget = 0
+        self._underBudget = 0
+
+    def add(self, movie, priority=1.0, visible=True, **kw):
+        member = self.find(movie)
+        if member is None:
+            member = GovernedMovie(movie, priority, visible, **kw)
+            self.members.append(member)
+        else:
+            member.priority = priority
+            member.visible = visible
+        return member
+
+    def remove(self, movie):
+        member = self.find(movie)
+        if member is None:
+            return False
+        member.setLevel(levelFull)
+        self.members.remove(member)
+        return True
+
+    def find(self, movie):
+        for member in self.members:
+            if member.movie is movie:
+                return member
+        return None
+
+    def getMember(self, movie):
+        member = self.find(movie)
+        if member is None:
+            raise KeyError("Movie is not governed: %r" % (movie,))
+        return member
+
+    def setPriority(self, movie, priority):
+        self.getMember(movie).priority = priority
+    def setVisible(self, movie, visible=True):
+        self.getMember(movie).visible = visible
+
+    def getFrameBudget(self):
+        return 1.0 / self.targetFrameRate
+
+    #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    def process(self):
+        # default_timer has sub-millisecond resolution on Windows, unlike time.time()
+        t0 = default_timer()
+        for member in self.members:
+            member.process()
+        frameTime = default_timer() - t0
+
+        self.recordFrameTime(frameTime)
+        return frameTime
+
+    def recordFrameTime(self, frameTime):
+        if self.avgFrameTime is None:
+            self.avgFrameTime = frameTime
+        else:
+            a = self.smoothing
+            self.avgFrameTime = (1-a)*self.avgFrameTime + a*frameTime
+
+        budget = self.getFrameBudget()
+        if self.avgFrameTime > budget * self.degradeThreshold:
+            self._overBudget += 1
+            self._underBudget = 0
+            if self._overBudget >= self.degradeFrames:
+                self._overBudget = 0
+                self.degrade()
+
+        elif self.avgFrameTime < budget * self.restoreThreshold:
+            self._underBudget += 1
+            self._overBudget = 0
+            if self._underBudget >= self.restoreFrames:
+                self._underBudget = 0
+                self.restore()
+
+        else:
+            self._overBudget = 0
+            self._underBudget = 0
+
+    def degrade(self):
+        candidates = [m for m in self.members if m.nextLevel() is not None]
+        if not candidates:
+            return None
+        member = min(candidates, key=GovernedMovie.degradeCost)
+        member.setLevel(member.nextLevel())
+        self.logDecision('degrade', member)
+        return member
+
+    def restore(self):
+        candidates = [m for m in self.members if m.level > levelFull]
+        if not candidates:
+            return None
+        member = max(candidates, key=GovernedMovie.restoreCost)
+        member.setLevel(member.prevLevel())
+        self.logDecision('restore', member)
+        return member
+
+    def logDecision(self, action, member):
+        # entries are (timestamp, action, movie, level, levelName, avgFrameTime)
+        self.log.append((time.time(), action, member.movie,
+                member.level, levelNames[member.level], self.avgFrameTime))
+
+    def printLog(self):
+        print 'Quality Governor::'
+        for ts, action, movie, level, levelName, avgFrameTime in self.log:
+            print '  %.3f %-8s %r -> %s (%.1f ms)' % (ts, action, movie, levelName, avgFrameTime*1000)
+        print
@@ -16,7 +16,9 @@ import math
 from struct import pack, unpack
 
 import ctypes, ctypes.util
-from ctypes import cast, byref, c_void_p, c_short
+from ctypes import cast, byref, sizeof, c_void_p, c_short, c_uint32
+
+import numpy
 
 from .movieDisplayContext import QTGWorldContext, QTOpenGLVisualContext
 from .coreFoundationUtils import asCFString, asCFURL, c_appleid, fromAppleId, toAppleId, booleanTrue, booleanFalse
@@ -37,17 +39,24 @@ libQuickTime.GetMovieVolume.argtypes = [c_void_p]
 libQuickTime.GetMovieVolume.restype = c_short
 libQuickTime.SetMovieVolume.argtypes = [c_void_p, c_short]
 
+libQuickTime.GetMovieTimeBase.restype = c_void_p
+libQuickTime.GetTimeBaseMasterTimeBase.restype = c_void_p
+libQuickTime.GetTimeBaseMasterClock.restype = c_void_p
+
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ QuickTime Stuff
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 class TimeRecord(ctypes.Structure):
     _fields_ = [
-        ('value', ctypes.c_long),
-        ('scale', ctypes.c_long),
+        ('value', ctypes.c_int64), # CompTimeValue is a wide, in native byte order
+        ('scale', ctypes.c_int32),
         ('base', ctypes.c_void_p),
         ]
 
+# QuickTime is only available to 32-bit processes, where the C struct is 16 bytes
+assert ctypes.sizeof(c_void_p) != 4 or ctypes.sizeof(TimeRecord) == 16, ctypes.sizeof(TimeRecord)
+
 class QTNewMoviePropertyElement(ctypes.Structure):
     _fields_ = [
         ('propClass', c_appleid),
@@ -78,6 +87,58 @@ class QTNewMoviePropertyElement(ctypes.Structure):
         propList = [klass.new(*p) for propList in propLists for p in propList]
         return (klass*len(propList))(*propList)
 
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+#~ Audio Extraction Stuff
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+kAudioFormatFlagIsFloat = 0x1
+kAudioFormatFlagIsBigEndian = 0x2
+kAudioFormatFlagIsSignedInteger = 0x4
+kAudioFormatFlagIsPacked = 0x8
+if sys.byteorder == 'big':
+    kAudioFormatFlagsNativeEndian = kAudioFormatFlagIsBigEndian
+else: kAudioFormatFlagsNativeEndian = 0
+
+kAudioChannelLayoutTag_Mono = (100<<16) | 1
+kAudioChannelLayoutTag_Stereo = (101<<16) | 2
+kAudioChannelLayoutTag_DiscreteInOrder = (147<<16)
+
+kQTMovieAudioExtractionComplete = 0x1
+
+class AudioStreamBasicDescription(ctypes.Structure):
+    _fields_ = [
+        ('mSampleRate', ctypes.c_double),
+        ('mFormatID', c_appleid),
+        ('mFormatFlags', c_uint32),
+        ('mBytesPerPacket', c_uint32),
+        ('mFramesPerPacket', c_uint32),
+        ('mBytesPerFrame', c_uint32),
+        ('mChannelsPerFrame', c_uint32),
+        ('mBitsPerChannel', c_uint32),
+        ('mReserved', c_uint32),
+        ]
+
+class AudioChannelLayout(ctypes.Structure):
+    # header only; layouts described by tag carry no channel descriptions
+    _fields_ = [
+        ('mChannelLayoutTag', c_uint32),
+        ('mChannelBitmap', c_uint32),
+        ('mNumberChannelDescriptions', c_uint32),
+        ]
+
+class AudioBuffer(ctypes.Structure):
+    _fields_ = [
+        ('mNumberChannels', c_uint32),
+        ('mDataByteSize', c_uint32),
+        ('mData', c_void_p),
+        ]
+
+class AudioBufferList(ctypes.Structure):
+    _fields_ = [
+        ('mNumberBuffers', c_uint32),
+        ('mBuffers', AudioBuffer*1),
+        ]
+
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 #~ Definitions 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
@@ -94,6 +155,135 @@ def qtVersion():
 
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+class QTMovieAudioExtraction(object):
+    """Pulls interleaved PCM out of a movie through a movie audio extraction session.
+
+    Samples are delivered as numpy arrays shaped (frames, channels) in either
+    float32 or int16, converted by QuickTime to the requested sample rate.
+    """
+
+    _as_parameter_ = None
+    sampleFormats = {
+        numpy.dtype('float32'): kAudioFormatFlagIsFloat,
+        numpy.dtype('int16'): kAudioFormatFlagIsSignedInteger,
+        }
+
+    def __init__(self, movie, sampleRate=44100.0, channels=2, dtype='float32'):
+        self.movie = movie
+        self.create()
+        self.setFormat(sampleRate, channels, dtype)
+
+    def __del__(self):
+        try:
+            self.destroy()
+        except Exception:
+            sys.excepthook(*sys.exc_info())
+
+    def create(self):
+        if self._as_parameter_:
+            return self
+
+        self._as_parameter_ = c_void_p()
+        errqt = libQuickTime.MovieAudioExtractionBegin(self.movie, 0, byref(self._as_parameter_))
+        if errqt or not self._as_parameter_:
+            self._as_parameter_ = None
+            raise RuntimeError("MovieAudioExtractionBegin failed with error code: %r" % (errqt,))
+        self._bufferList = AudioBufferList(1)
+        return self
+
+    def destroy(self):
+        if not self._as_parameter_: return
+        libQuickTime.MovieAudioExtractionEnd(self)
+        self._as_parameter_ = None
+
+    def setProperty(self, cid, pid, value):
+        errqt = libQuickTime.MovieAudioExtractionSetProperty(self, 
+                fromAppleId(cid), fromAppleId(pid), sizeof(value), byref(value))
+        if errqt:
+            raise RuntimeError("MovieAudioExtractionSetProperty %r %r failed with error code: %r" % (cid, pid, errqt))
+
+    def setFormat(self, sampleRate=44100.0, channels=2, dtype='float32'):
+        dtype = numpy.dtype(dtype)
+        if dtype not in self.sampleFormats:
+            raise ValueError("Unsupported sample format: %r" % (dtype,))
+
+        asbd = AudioStreamBasicDescription()
+        asbd.mSampleRate = sampleRate
+        asbd.mFormatID = fromAppleId('lpcm')
+        asbd.mFormatFlags = self.sampleFormats[dtype] | kAudioFormatFlagIsPacked | kAudioFormatFlagsNativeEndian
+        asbd.mFramesPerPacket = 1
+        asbd.mChannelsPerFrame = channels
+        asbd.mBitsPerChannel = dtype.itemsize * 8
+        asbd.mBytesPerFrame = dtype.itemsize * channels
+        asbd.mBytesPerPacket = asbd.mBytesPerFrame
+        self.setProperty('xaud', 'asbd', asbd)
+
+        if channels == 1:
+            layoutTag = kAudioChannelLayoutTag_Mono
+        elif channels == 2:
+            layoutTag = kAudioChannelLayoutTag_Stereo
+        else: layoutTag = kAudioChannelLayoutTag_DiscreteInOrder | channels
+        self.setProperty('xaud', 'clay', AudioChannelLayout(layoutTag, 0, 0))
+
+        self.sampleRate = sampleRate
+        self.channels = channels
+        self.dtype = dtype
+
+    def setTime(self, seconds):
+        timeScale = self.movie.getTimeScale()
+        timeRecord = TimeRecord(int(seconds * timeScale), timeScale, None)
+        self.setProperty('xmov', 'time', timeRecord)
+
+    def newBuffer(self, frames=4096):
+        return numpy.empty((frames, self.channels), self.dtype)
+
+    def fill(self, buffer):
+        """Fills buffer from the current extraction time; returns (frames, complete)"""
+        if buffer.dtype != self.dtype or buffer.shape[1:] != (self.channels,) or not buffer.flags.c_contiguous:
+            raise ValueError("Buffer does not match the extraction format")
+
+        audioBuffer = self._bufferList.mBuffers[0]
+        audioBuffer.mNumberChannels = self.channels
+        audioBuffer.mDataByteSize = buffer.nbytes
+        audioBuffer.mData = buffer.ctypes.data
+
+        numFrames = c_uint32(len(buffer))
+        flags = c_uint32(0)
+        errqt = libQuickTime.MovieAudioExtractionFillBuffer(self, byref(numFrames), byref(self._bufferList), byref(flags))
+        if errqt:
+            raise RuntimeError("MovieAudioExtractionFillBuffer failed with error code: %r" % (errqt,))
+        return numFrames.value, bool(flags.value & kQTMovieAudioExtractionComplete)
+
+    def iterChunks(self, frames=4096, maxFrames=None, buffer=None):
+        """Yields views of one reused buffer; copy a chunk to keep it past the next iteration.
+
+        Every chunk holds the requested number of frames except possibly the last.
+        """
+        if buffer is None:
+            buffer = self.newBuffer(frames)
+        frames = len(buffer)
+
+        while maxFrames is None or maxFrames > 0:
+            if maxFrames is not None and maxFrames < frames:
+                chunk = buffer[:maxFrames]
+            else: chunk = buffer
+
+            # the session may return short reads before the end of the movie
+            n = 0; complete = False
+            while n < len(chunk) and not complete:
+                count, complete = self.fill(chunk[n:])
+                if not count: break
+                n += count
+
+            if maxFrames is not None:
+                maxFrames -= n
+            if n:
+                yield chunk[:n]
+            if complete or n < len(chunk):
+                break
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
 class QTMovie(object):
     _as_parameter_ = None
 
@@ -205,6 +395,30 @@ class QTMovie(object):
     def processMovieTask(self, seconds=0):
         return libQuickTime.MoviesTask(self, int(seconds*1000))
 
+    MovieDrawingCompleteProc = ctypes.CFUNCTYPE(ctypes.c_short, c_void_p, ctypes.c_long)
+    movieDrawingCallWhenChanged = 0x0
+    movieDrawingCallAlways = 0x1
+    _drawingCompleteProc = None
+    def setDrawingComplete(self, callback=None, flags=movieDrawingCallWhenChanged):
+        """Calls callback(movie) from MoviesTask after each frame is drawn into the display context"""
+        if callback is None:
+            libQuickTime.SetMovieDrawingCompleteProc(self, 0, None, 0)
+            self._drawingCompleteProc = None
+            return
+
+        wrSelf = weakref.ref(self)
+        def drawingComplete(theMovie, refCon):
+            movie = wrSelf()
+            if movie is not None:
+                try:
+                    callback(movie)
+                except Exception:
+                    sys.excepthook(*sys.exc_info())
+            return 0
+
+        self._drawingCompleteProc = self.MovieDrawingCompleteProc(drawingComplete)
+        libQuickTime.SetMovieDrawingCompleteProc(self, flags, self._drawingCompleteProc, 0)
+
     #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
     def getLoadState(self):
@@ -212,11 +426,28 @@ class QTMovie(object):
 
     def setLooping(self, looping=1):
         libQuickTime.GoToBeginningOfMovie(self)
-        timeBase = libQuickTime.GetMovieTimeBase(self)
+        timeBase = self.getTimeBase()
         libQuickTime.SetTimeBaseFlags(timeBase, looping) # loopTimeBase
 
         hintsLoop = 0x2
-        libQuickTime.SetMoviePlayHints(self, hintsLoop, hintsLoop)
+        self.setPlayHints(hintsLoop, hintsLoop)
+
+    def setPlayHints(self, flags, flagsMask=None):
+        if flagsMask is None:
+            flagsMask = flags
+        libQuickTime.SetMoviePlayHints(self, flags, flagsMask)
+
+    def getTimeBase(self):
+        return c_void_p(libQuickTime.GetMovieTimeBase(self))
+    def getMasterTimeBase(self):
+        return c_void_p(libQuickTime.GetTimeBaseMasterTimeBase(self.getTimeBase()))
+    def setMasterTimeBase(self, masterTimeBase):
+        # slaveZero of None lines up time zero of the movie with time zero of the master
+        libQuickTime.SetMovieMasterTimeBase(self, masterTimeBase, None)
+    def getMasterClock(self):
+        return c_void_p(libQuickTime.GetTimeBaseMasterClock(self.getTimeBase()))
+    def setMasterClock(self, masterClock):
+        libQuickTime.SetMovieMasterClock(self, masterClock, None)
 
     def printTracks(self):
         print 'Movie Tracks::'
@@ -296,6 +527,28 @@ class QTMovie(object):
         elif volume == 0.0:
             self.setVolume(0.1)
 
+    def iterAudioChunks(self, frames=4096, sampleRate=44100.0, channels=2, dtype='float32', buffer=None):
+        """Yields the movie's audio as (frames, channels) numpy chunks.
+
+        The same buffer is reused for every chunk, so memory stays bounded
+        regardless of movie length.  Pass buffer to supply your own.
+        """
+        return self.iterAudioRange(0, None, frames, sampleRate, channels, dtype, buffer)
+
+    def iterAudioRange(self, start, end=None, frames=4096, sampleRate=44100.0, channels=2, dtype='float32', buffer=None):
+        """Like iterAudioChunks, restricted to start through end seconds"""
+        extraction = QTMovieAudioExtraction(self, sampleRate, channels, dtype)
+        try:
+            extraction.setTime(start)
+            if end is not None:
+                maxFrames = max(0, int(round((end - start) * sampleRate)))
+            else: maxFrames = None
+
+            for chunk in extraction.iterChunks(frames, maxFrames, buffer):
+                yield chunk
+        finally:
+            extraction.destroy()
+
     def start(self):
         libQuickTime.StartMovie(self)
     def stop(self):